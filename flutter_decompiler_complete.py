@@ -5,15 +5,516 @@ import sys
 import subprocess
 import re
 import json
+import copy
+import hashlib
+import io
+import queue
+import struct
+import threading
+import time
+import heapq
+import random
+import sqlite3
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+class ProgressEvents:
+    def __init__(self, stream=None, callback=None, quiet=False, min_interval=0.5):
+        self.stream = stream
+        self.callback = callback
+        self.quiet = quiet
+        self.min_interval = min_interval
+        self._stages = {}
+        self._last_progress = {}
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_target(cls, target, quiet=False, min_interval=0.5):
+        if target is None:
+            return cls(quiet=quiet, min_interval=min_interval)
+        if target == '-':
+            # NDJSON owns stdout, so human-readable output has to go
+            return cls(stream=sys.stdout, quiet=True, min_interval=min_interval)
+        if target.startswith('fd:'):
+            stream = os.fdopen(int(target[3:]), 'w', buffering=1, encoding='utf-8')
+        else:
+            stream = open(target, 'a', buffering=1, encoding='utf-8')
+        return cls(stream=stream, quiet=quiet, min_interval=min_interval)
+    
+    @property
+    def verbose(self):
+        return not self.quiet
+    
+    @property
+    def enabled(self):
+        return self.stream is not None or self.callback is not None
+    
+    def log(self, message):
+        if not self.quiet:
+            print(message)
+    
+    def stage_start(self, stage, target=None, total=None, unit=None):
+        with self._lock:
+            self._stages[(stage, target)] = {'start': time.monotonic(), 'counters': {}}
+        self.emit('stage_start', stage=stage, target=target, total=total, unit=unit)
+    
+    def advance(self, stage, target, unit, amount=1, total=None):
+        with self._lock:
+            state = self._stages.setdefault((stage, target), {'start': time.monotonic(), 'counters': {}})
+            done = state['counters'].get(unit, 0) + amount
+            state['counters'][unit] = done
+        # The counter is already updated; only the rate-limited report remains
+        self._report_progress(stage, target, unit, done, total)
+    
+    def progress(self, stage, target, unit, done, total=None):
+        if not self.enabled:
+            return
+        
+        with self._lock:
+            state = self._stages.setdefault((stage, target), {'start': time.monotonic(), 'counters': {}})
+            state['counters'][unit] = done
+        self._report_progress(stage, target, unit, done, total)
+    
+    def _report_progress(self, stage, target, unit, done, total):
+        if not self.enabled:
+            return
+        
+        now = time.monotonic()
+        key = (stage, target, unit)
+        with self._lock:
+            state = self._stages.setdefault((stage, target), {'start': now, 'counters': {}})
+            finished = total is not None and done >= total
+            if not finished and now - self._last_progress.get(key, 0) < self.min_interval:
+                return
+            self._last_progress[key] = now
+            elapsed = now - state['start']
+        
+        rate = done / elapsed if elapsed > 0 else None
+        eta = None
+        if total is not None and rate:
+            eta = round(max(total - done, 0) / rate, 2)
+        
+        self.emit('progress', stage=stage, target=target, unit=unit, done=done, total=total,
+                  rate=round(rate, 2) if rate else None, eta=eta, elapsed=round(elapsed, 3))
+    
+    def stage_end(self, stage, target=None, **fields):
+        with self._lock:
+            state = self._stages.pop((stage, target), None)
+            for key in [key for key in self._last_progress if key[:2] == (stage, target)]:
+                del self._last_progress[key]
+        
+        if state is not None:
+            elapsed = time.monotonic() - state['start']
+            fields['elapsed'] = round(elapsed, 3)
+            fields['counters'] = state['counters']
+            fields['throughput'] = {unit: round(done / elapsed, 2) if elapsed > 0 else None
+                                    for unit, done in state['counters'].items()}
+        self.emit('stage_end', stage=stage, target=target, **fields)
+    
+    def emit(self, event, **fields):
+        if not self.enabled:
+            return
+        
+        record = {'ts': round(time.time(), 3), 'event': event}
+        record.update((key, value) for key, value in fields.items() if value is not None)
+        
+        if self.callback is not None:
+            self.callback(record)
+        if self.stream is not None:
+            line = json.dumps(record, ensure_ascii=False, default=str)
+            with self._lock:
+                self.stream.write(line + '\n')
+                self.stream.flush()
+
+def current_rss_mb():
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+class StageBudget:
+    def __init__(self, stage, time_limit=None, memory_limit=None, degrade_at=0.8, events=None):
+        self.stage = stage
+        self.time_limit = time_limit
+        self.memory_limit = memory_limit
+        self.degrade_at = degrade_at
+        self.events = events or ProgressEvents()
+        self.start = time.monotonic()
+        self.state = 'ok'
+        self.actions = []
+        self.peak_rss_mb = None
+    
+    @property
+    def limited(self):
+        return self.time_limit is not None or self.memory_limit is not None
+    
+    @property
+    def degraded(self):
+        return self.state != 'ok'
+    
+    @property
+    def exhausted(self):
+        return self.state == 'exhausted'
+    
+    def check(self):
+        if not self.limited or self.exhausted:
+            return self.state
+        
+        usage = []
+        if self.time_limit is not None:
+            usage.append(('time', (time.monotonic() - self.start) / self.time_limit))
+        if self.memory_limit is not None:
+            rss = current_rss_mb()
+            if rss is not None:
+                self.peak_rss_mb = max(self.peak_rss_mb or 0, rss)
+                usage.append(('memory', rss / self.memory_limit))
+        if not usage:
+            return self.state
+        
+        resource_name, ratio = max(usage, key=lambda item: item[1])
+        if ratio >= 1.0:
+            self._transition('exhausted', resource_name)
+        elif ratio >= self.degrade_at and self.state == 'ok':
+            self._transition('degraded', resource_name)
+        
+        return self.state
+    
+    def _transition(self, state, resource_name):
+        self.state = state
+        self.events.log(f"🔵 {self.stage}: {resource_name} budget {state}")
+        self.events.emit('budget', stage=self.stage, state=state, resource=resource_name,
+                         elapsed=round(time.monotonic() - self.start, 3), rss_mb=self.peak_rss_mb)
+    
+    def note(self, action):
+        if action not in self.actions:
+            self.actions.append(action)
+    
+    def record(self):
+        return {
+            'time_limit': self.time_limit,
+            'memory_limit_mb': self.memory_limit,
+            'elapsed': round(time.monotonic() - self.start, 3),
+            'peak_rss_mb': round(self.peak_rss_mb, 1) if self.peak_rss_mb is not None else None,
+            'state': self.state,
+            'actions': self.actions
+        }
+
+class ExecutionBudget:
+    STAGES = ('snapshot', 'symbols', 'reconstruct')
+    
+    def __init__(self, time_limit=None, memory_limit=None, stage_limits=None, degrade_at=0.8,
+                 events=None):
+        self.time_limit = time_limit
+        self.memory_limit = memory_limit
+        self.stage_limits = stage_limits or {}
+        self.degrade_at = degrade_at
+        self.events = events or ProgressEvents()
+    
+    def stage(self, name):
+        # An override field left empty keeps the global limit for that resource
+        time_limit, memory_limit = self.stage_limits.get(name, (None, None))
+        if time_limit is None:
+            time_limit = self.time_limit
+        if memory_limit is None:
+            memory_limit = self.memory_limit
+        return StageBudget(name, time_limit, memory_limit, self.degrade_at, self.events)
+
+def iter_strings(file_path, min_length=4, budget=None, degraded_min_length=8, degraded_sample_every=4,
+                 obfuscation_map=None):
+    scan_length = min_length
+    if obfuscation_map is not None and len(obfuscation_map):
+        # Dart's mangled names are 1-3 characters, below the usual strings threshold
+        scan_length = max(1, min(min_length, obfuscation_map.min_key_length))
+    
+    process = subprocess.Popen(['strings', '-n', str(scan_length), file_path],
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                               text=True, errors='replace')
+    try:
+        for i, line in enumerate(process.stdout):
+            if budget is not None and i % 4096 == 0 and budget.check() != 'ok':
+                if budget.exhausted:
+                    budget.note('truncated strings stream')
+                    break
+                budget.note(f"minimum string length {degraded_min_length}")
+                budget.note(f"sampled 1 in {degraded_sample_every} strings")
+            
+            line = line.strip()
+            if not line:
+                continue
+            
+            # Short runs only matter when the map knows them
+            if len(line) < min_length and obfuscation_map.deobfuscate(line) == line:
+                continue
+            
+            if budget is not None and budget.degraded:
+                if len(line) < degraded_min_length or i % degraded_sample_every:
+                    continue
+            
+            yield line
+    finally:
+        process.stdout.close()
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+
+class LibraryFingerprinter:
+    ELF_MAGIC = b'\x7fELF'
+    PT_LOAD = 1
+    PT_DYNAMIC = 2
+    DT_NULL = 0
+    DT_HASH = 4
+    DT_STRTAB = 5
+    DT_SYMTAB = 6
+    DT_STRSZ = 10
+    DT_SYMENT = 11
+    DT_SONAME = 14
+    # HASH, STRTAB, RELA, REL, JMPREL, GNU_HASH, VERSYM, VERDEF, VERNEED: tables laid out after .dynsym
+    DT_TABLE_TAGS = (4, 5, 7, 17, 23, 0x6ffffef5, 0x6ffffff0, 0x6ffffffc, 0x6ffffffe)
+    PREFIX_LIMIT = 4 * 1024 * 1024
+    ELF_MACHINES = {
+        3: 'x86',
+        8: 'mips',
+        40: 'armeabi-v7a',
+        62: 'x86_64',
+        183: 'arm64-v8a'
+    }
+    ABI_PREFERENCE = ['arm64-v8a', 'armeabi-v7a', 'x86_64', 'x86']
+    DART_APP_SYMBOLS = {
+        '_kDartVmSnapshotData',
+        '_kDartVmSnapshotInstructions',
+        '_kDartIsolateSnapshotData',
+        '_kDartIsolateSnapshotInstructions'
+    }
+    ENGINE_SYMBOL_PREFIXES = ('InternalFlutterGpu_', 'FlutterEngine', 'Dart_')
+    
+    def __init__(self, events=None):
+        self.events = events or ProgressEvents()
+    
+    def fingerprint_apk(self, apk_path):
+        fingerprints = {}
+        
+        with zipfile.ZipFile(apk_path, 'r') as zip_ref:
+            for info in zip_ref.infolist():
+                if not (info.filename.startswith('lib/') and info.filename.endswith('.so')):
+                    continue
+                with zip_ref.open(info) as f:
+                    lib_name = info.filename[len('lib/'):]
+                    fingerprints[lib_name] = self.fingerprint_stream(f)
+        
+        return fingerprints
+    
+    def fingerprint_file(self, file_path):
+        with open(file_path, 'rb') as f:
+            return self.fingerprint_stream(f)
+    
+    def fingerprint_stream(self, f):
+        fingerprint = {
+            'kind': 'unknown',
+            'abi': None,
+            'elf_class': None,
+            'soname': None,
+            'dynamic_symbols': 0,
+            'dart_symbols': [],
+            'bytes_read': 0
+        }
+        
+        try:
+            self._parse_elf(f, fingerprint)
+        except (OSError, struct.error, ValueError, zipfile.BadZipFile) as e:
+            fingerprint['kind'] = 'unknown'
+            fingerprint['error'] = str(e)
+        
+        return fingerprint
+    
+    def _read_at(self, f, offset, size, fingerprint):
+        f.seek(offset)
+        data = f.read(size)
+        fingerprint['bytes_read'] += len(data)
+        if len(data) != size:
+            raise ValueError(f"truncated read at 0x{offset:x}")
+        return data
+    
+    def _read_forward(self, f, prefix, offset, size, fingerprint):
+        # Serve from the buffered prefix; anything else is read without seeking backwards,
+        # since a backward seek on a deflated ZipExtFile restarts inflation from byte 0
+        if offset + size <= len(prefix):
+            return prefix[offset:offset + size]
+        return self._read_at(f, offset, size, fingerprint)
+    
+    def _parse_elf(self, f, fingerprint):
+        f.seek(0)
+        header = f.read(64)
+        fingerprint['bytes_read'] += len(header)
+        if header[:4] != self.ELF_MAGIC:
+            fingerprint['kind'] = 'not_elf'
+            return
+        if len(header) < 64:
+            raise ValueError("truncated ELF header")
+        
+        is_64 = header[4] == 2
+        endian = '<' if header[5] == 1 else '>'
+        machine = struct.unpack_from(endian + 'H', header, 18)[0]
+        
+        fingerprint['elf_class'] = 64 if is_64 else 32
+        fingerprint['abi'] = self.ELF_MACHINES.get(machine, f"machine_{machine}")
+        
+        if is_64:
+            phoff = struct.unpack_from(endian + 'Q', header, 0x20)[0]
+            phentsize, phnum = struct.unpack_from(endian + 'HH', header, 0x36)
+            segment_format, segment_fields = endian + 'IIQQQQQQ', (0, 2, 3, 5)
+            dynamic_format = endian + 'qQ'
+            symbol_format = endian + 'IBBHQQ'
+        else:
+            phoff = struct.unpack_from(endian + 'I', header, 0x1C)[0]
+            phentsize, phnum = struct.unpack_from(endian + 'HH', header, 0x2A)
+            segment_format, segment_fields = endian + 'IIIIIIII', (0, 1, 2, 4)
+            dynamic_format = endian + 'iI'
+            symbol_format = endian + 'IIIBBH'
+        
+        fingerprint['kind'] = 'native'
+        if not phoff or not phnum:
+            return
+        
+        prefix = header + f.read(max(phoff + phentsize * phnum - len(header), 0))
+        fingerprint['bytes_read'] += len(prefix) - len(header)
+        program_table = self._read_forward(f, prefix, phoff, phentsize * phnum, fingerprint)
+        # (type, offset, vaddr, filesz) in both ELF classes
+        segments = []
+        for i in range(phnum):
+            entry = struct.unpack_from(segment_format, program_table, i * phentsize)
+            segments.append(tuple(entry[field] for field in segment_fields))
+        
+        dynamic = next((seg for seg in segments if seg[0] == self.PT_DYNAMIC), None)
+        if dynamic is None:
+            return
+        
+        # .dynsym and .dynstr sit in front of .dynamic, so keep that stretch while passing over it
+        keep = min(dynamic[1], self.PREFIX_LIMIT)
+        if keep > len(prefix):
+            more = f.read(keep - len(prefix))
+            fingerprint['bytes_read'] += len(more)
+            prefix += more
+        
+        dynamic_data = self._read_forward(f, prefix, dynamic[1], dynamic[3], fingerprint)
+        entry_size = struct.calcsize(dynamic_format)
+        tags = {}
+        for i in range(len(dynamic_data) // entry_size):
+            tag, value = struct.unpack_from(dynamic_format, dynamic_data, i * entry_size)
+            if tag == self.DT_NULL:
+                break
+            tags.setdefault(tag, value)
+        
+        loads = [seg for seg in segments if seg[0] == self.PT_LOAD]
+        
+        def file_offset(address):
+            for _, offset, vaddr, filesz in loads:
+                if vaddr <= address < vaddr + filesz:
+                    return address - vaddr + offset
+            return None
+        
+        if self.DT_SYMTAB not in tags or self.DT_STRTAB not in tags:
+            return
+        symtab = file_offset(tags[self.DT_SYMTAB])
+        strtab = file_offset(tags[self.DT_STRTAB])
+        symbol_size = tags.get(self.DT_SYMENT) or struct.calcsize(symbol_format)
+        if symtab is None or strtab is None:
+            return
+        
+        # PT_DYNAMIC has no symbol count: DT_HASH carries it, otherwise the table ends where
+        # the next dynamic-section table begins
+        if self.DT_HASH in tags and file_offset(tags[self.DT_HASH]) is not None:
+            hash_header = self._read_forward(f, prefix, file_offset(tags[self.DT_HASH]), 8, fingerprint)
+            count = struct.unpack_from(endian + 'II', hash_header)[1]
+        else:
+            following = [tags[tag] for tag in self.DT_TABLE_TAGS
+                         if tag in tags and tags[tag] > tags[self.DT_SYMTAB]]
+            if not following:
+                return
+            count = (min(following) - tags[self.DT_SYMTAB]) // symbol_size
+        
+        symbol_data = self._read_forward(f, prefix, symtab, count * symbol_size, fingerprint)
+        string_data = self._read_forward(f, prefix, strtab, tags.get(self.DT_STRSZ, 0), fingerprint)
+        
+        def symbol_name(index):
+            end = string_data.find(b'\x00', index)
+            return string_data[index:end].decode('utf-8', errors='replace')
+        
+        names = []
+        for i in range(count):
+            entry = struct.unpack_from(symbol_format, symbol_data, i * symbol_size)
+            section_index = entry[3] if is_64 else entry[5]
+            if entry[0] == 0 or section_index == 0:
+                continue
+            names.append(symbol_name(entry[0]))
+        
+        soname = symbol_name(tags[self.DT_SONAME]) if self.DT_SONAME in tags else None
+        fingerprint['soname'] = soname
+        fingerprint['dynamic_symbols'] = len(names)
+        fingerprint['dart_symbols'] = sorted(self.DART_APP_SYMBOLS.intersection(names))
+        
+        if fingerprint['dart_symbols']:
+            fingerprint['kind'] = 'dart_app'
+        elif any(name.startswith(self.ENGINE_SYMBOL_PREFIXES) for name in names):
+            fingerprint['kind'] = 'flutter_engine'
+        elif soname == 'libflutter.so' and 'JNI_OnLoad' in names:
+            # Release engines export little else; the soname survives renaming the file
+            fingerprint['kind'] = 'flutter_engine'
+    
+    def select_dart_apps(self, fingerprints):
+        def preference(lib_name):
+            abi = fingerprints[lib_name]['abi']
+            if abi in self.ABI_PREFERENCE:
+                return self.ABI_PREFERENCE.index(abi), lib_name
+            return len(self.ABI_PREFERENCE), lib_name
+        
+        dart_apps = [name for name, info in fingerprints.items() if info['kind'] == 'dart_app']
+        return sorted(dart_apps, key=preference)
+    
+    def print_report(self, fingerprints):
+        self.events.log("\n🔵 LIBRARY FINGERPRINTS:")
+        for lib_name, info in sorted(fingerprints.items()):
+            self.events.emit('library', name=lib_name, kind=info['kind'], abi=info['abi'])
+            self.events.log(f"  🔵 {lib_name}: {info['kind']} ({info['abi'] or '?'}, "
+                            f"{info['bytes_read']} bytes read)")
+        
+        dart_apps = self.select_dart_apps(fingerprints)
+        if dart_apps:
+            self.events.log(f"⚪ Flutter app detected, Dart code in: {', '.join(dart_apps)}")
+        else:
+            self.events.log("🔵 No Dart AOT library found")
 
 class FlutterExtractor:
-    def __init__(self):
+    LIB_ENTRY = re.compile(r'^lib/([^/]+)/([^/]+\.so)$')
+    
+    def __init__(self, workers=None, queue_size=4, events=None):
         self.temp_dir = "temp_extract"
+        self.events = events or ProgressEvents()
+        self.fingerprinter = LibraryFingerprinter(self.events)
+        self.fingerprints = {}
+        self.analysis_results = {}
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.queue_size = queue_size
         
     def extract_apk(self, apk_path):
         try:
-            print(f"🔵 Analyzing APK: {apk_path}")
+            self.events.log(f"🔵 Analyzing APK: {apk_path}")
+            self.events.stage_start('extract', apk_path)
+            
+            self.fingerprints = self.fingerprinter.fingerprint_apk(apk_path)
+            self.fingerprinter.print_report(self.fingerprints)
             
             if not os.path.exists(self.temp_dir):
                 os.makedirs(self.temp_dir)
@@ -21,28 +522,142 @@ class FlutterExtractor:
             with zipfile.ZipFile(apk_path, 'r') as zip_ref:
                 zip_ref.extractall(self.temp_dir)
             
-            print("⚪ APK successfully extracted")
+            self.events.log("⚪ APK successfully extracted")
             
             self._list_all_libs()
             
             flutter_libs = self._find_flutter_libs()
+            self.events.stage_end('extract', apk_path, libraries=len(flutter_libs))
             
             return flutter_libs
             
         except Exception as e:
-            print(f"🔵 Error: {e}")
+            self.events.log(f"🔵 Error: {e}")
+            self.events.stage_end('extract', apk_path, error=str(e))
+            return None
+    
+    def extract_apk_pipelined(self, apk_path, analyze=None):
+        try:
+            self.events.log(f"🔵 Analyzing APK (pipelined): {apk_path}")
+            self.events.stage_start('extract', apk_path)
+            
+            if not os.path.exists(self.temp_dir):
+                os.makedirs(self.temp_dir, exist_ok=True)
+            
+            self.fingerprints = {}
+            self.analysis_results = {}
+            libs = {}
+            errors = []
+            lock = threading.Lock()
+            
+            # Bounded queue: the inflater blocks once queue_size libraries are waiting
+            buffers = queue.Queue(maxsize=self.queue_size)
+            
+            producer = threading.Thread(target=self._inflate_entries,
+                                        args=(apk_path, buffers, errors))
+            workers = [threading.Thread(target=self._scan_buffers,
+                                        args=(buffers, analyze, libs, lock))
+                       for _ in range(self.workers)]
+            
+            producer.start()
+            for worker in workers:
+                worker.start()
+            producer.join()
+            for worker in workers:
+                worker.join()
+            
+            if errors:
+                raise errors[0]
+            
+            self.events.log("⚪ APK successfully extracted")
+            self.fingerprinter.print_report(self.fingerprints)
+            self.events.stage_end('extract', apk_path, libraries=len(libs),
+                                  dart_apps=self.fingerprinter.select_dart_apps(self.fingerprints))
+            
+            return libs
+            
+        except Exception as e:
+            self.events.log(f"🔵 Error: {e}")
+            self.events.stage_end('extract', apk_path, error=str(e))
             return None
     
+    def _inflate_entries(self, apk_path, buffers, errors):
+        sentinels_sent = False
+        try:
+            with zipfile.ZipFile(apk_path, 'r') as zip_ref:
+                lib_entries = []
+                other_entries = []
+                for info in zip_ref.infolist():
+                    match = self.LIB_ENTRY.match(info.filename)
+                    if match and '..' not in match.groups():
+                        lib_entries.append((match.group(1), match.group(2), info))
+                    else:
+                        other_entries.append(info)
+                
+                # Preferred ABIs first so their results are ready earliest
+                abi_order = LibraryFingerprinter.ABI_PREFERENCE
+                lib_entries.sort(key=lambda entry: (abi_order.index(entry[0])
+                                                    if entry[0] in abi_order else len(abi_order),
+                                                    entry[1]))
+                
+                total_bytes = sum(info.file_size for _, _, info in lib_entries)
+                for arch, file, info in lib_entries:
+                    buffers.put((f"{arch}/{file}", zip_ref.read(info)))
+                    self.events.log(f"   🔵 Inflated: {arch}/{file} ({info.file_size} bytes)")
+                    self.events.advance('extract', apk_path, 'bytes', info.file_size, total_bytes)
+                
+                for _ in range(self.workers):
+                    buffers.put(None)
+                sentinels_sent = True
+                
+                for info in other_entries:
+                    zip_ref.extract(info, self.temp_dir)
+        except Exception as e:
+            errors.append(e)
+            if not sentinels_sent:
+                for _ in range(self.workers):
+                    buffers.put(None)
+    
+    def _scan_buffers(self, buffers, analyze, libs, lock):
+        while True:
+            item = buffers.get()
+            if item is None:
+                return
+            
+            lib_name, data = item
+            try:
+                lib_path = os.path.join(self.temp_dir, "lib", *lib_name.split('/'))
+                os.makedirs(os.path.dirname(lib_path), exist_ok=True)
+                with open(lib_path, 'wb') as f:
+                    f.write(data)
+                self.events.emit('file_written', stage='extract', path=lib_path, size=len(data))
+                
+                fingerprint = self.fingerprinter.fingerprint_stream(io.BytesIO(data))
+                del data
+                
+                with lock:
+                    libs[lib_name] = lib_path
+                    self.fingerprints[lib_name] = fingerprint
+                
+                if analyze is not None and fingerprint['kind'] == 'dart_app':
+                    result = analyze(lib_name, lib_path)
+                    with lock:
+                        self.analysis_results[lib_name] = result
+            except Exception as e:
+                self.events.log(f"🔵 Scan error ({lib_name}): {e}")
+                with lock:
+                    self.analysis_results[lib_name] = {'error': str(e)}
+    
     def _list_all_libs(self):
         lib_path = os.path.join(self.temp_dir, "lib")
-        print("\n🔵 ALL LIB FILES:")
+        self.events.log("\n🔵 ALL LIB FILES:")
         if os.path.exists(lib_path):
             for arch in os.listdir(lib_path):
                 arch_path = os.path.join(lib_path, arch)
                 if os.path.isdir(arch_path):
-                    print(f"  🔵 {arch}:")
+                    self.events.log(f"  🔵 {arch}:")
                     for file in os.listdir(arch_path):
-                        print(f"     🔵 {file}")
+                        self.events.log(f"     🔵 {file}")
     
     def _find_flutter_libs(self):
         lib_path = os.path.join(self.temp_dir, "lib")
@@ -60,23 +675,33 @@ class FlutterExtractor:
         return flutter_files
 
 class SnapshotExtractor:
-    def __init__(self):
+    manifest_lock = threading.Lock()
+    
+    def __init__(self, region_size=100000, events=None, budget=None):
         self.temp_dir = "temp_extract"
+        self.events = events or ProgressEvents()
+        self.budget = budget or ExecutionBudget(events=self.events)
+        self.stage_budget = StageBudget('snapshot', events=self.events)
+        self.region_size = region_size
     
     def extract_snapshot(self, app_so_path, output_dir="snapshots"):
         if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
+            os.makedirs(output_dir, exist_ok=True)
         
-        print(f"🔵 Snapshot extraction: {app_so_path}")
+        self.events.log(f"🔵 Snapshot extraction: {app_so_path}")
+        self.events.stage_start('snapshot', app_so_path)
+        self.stage_budget = self.budget.stage('snapshot')
         
         offsets = self._find_snapshot_offsets(app_so_path)
         
         extracted = self._extract_snapshots(app_so_path, offsets, output_dir)
         
+        self.events.stage_end('snapshot', app_so_path, markers=len(offsets), files=len(extracted))
+        
         return extracted
     
     def _find_snapshot_offsets(self, file_path):
-        print("🔵 Searching for snapshot regions...")
+        self.events.log("🔵 Searching for snapshot regions...")
         
         with open(file_path, 'rb') as f:
             data = f.read()
@@ -90,7 +715,10 @@ class SnapshotExtractor:
         ]
         
         offsets = {}
-        for pattern in patterns:
+        for i, pattern in enumerate(patterns):
+            if self.stage_budget.check() == 'exhausted':
+                self.stage_budget.note(f"skipped patterns: {b', '.join(patterns[i:]).decode()}")
+                break
             start = 0
             while True:
                 pos = data.find(pattern, start)
@@ -98,70 +726,400 @@ class SnapshotExtractor:
                     break
                 offsets[f"0x{pos:08x}_{pattern.decode('utf-8', errors='ignore')}"] = pos
                 start = pos + 1
+            self.events.progress('snapshot', file_path, 'bytes', (i + 1) * len(data),
+                                 len(patterns) * len(data))
         
-        print(f"🔵 Found offsets: {len(offsets)}")
-        for name, offset in offsets.items():
-            print(f"   ⚪ {name}")
+        self.events.log(f"🔵 Found offsets: {len(offsets)}")
+        if self.events.verbose:
+            for name in offsets:
+                self.events.log(f"   ⚪ {name}")
         
         return offsets
     
     def _extract_snapshots(self, file_path, offsets, output_dir):
-        print("🔵 Extracting snapshots...")
+        self.events.log("🔵 Extracting snapshots...")
         
         with open(file_path, 'rb') as f:
             data = f.read()
         
+        regions = self._merge_regions(offsets, len(data))
+        
+        manifest = {
+            'source': file_path,
+            'region_size': self.region_size,
+            'regions': [],
+            'markers': {}
+        }
+        if self.stage_budget.limited:
+            manifest['budget'] = self.stage_budget.record()
         extracted_files = []
+        bytes_written = 0
         
-        for name, offset in offsets.items():
-            for size in [100000, 500000, 1000000, 5000000, 10000000]:
-                end_offset = min(offset + size, len(data))
-                snapshot_data = data[offset:end_offset]
-                
-                output_path = os.path.join(output_dir, f"snapshot_{name}.bin")
-                with open(output_path, 'wb') as f:
-                    f.write(snapshot_data)
-                
+        for start, end, markers in regions:
+            region_data = data[start:end]
+            digest = hashlib.sha256(region_data).hexdigest()
+            output_path = os.path.join(output_dir, f"region_{digest[:16]}.bin")
+            
+            # Regions are content-addressed, so identical bytes are only written once
+            if output_path not in extracted_files:
+                if not os.path.exists(output_path):
+                    with open(output_path, 'wb') as f:
+                        f.write(region_data)
+                    bytes_written += len(region_data)
+                    self.events.emit('file_written', stage='snapshot', path=output_path,
+                                     size=len(region_data))
+                    self.events.log(f"   ⚪ Saved: {output_path} ({len(region_data)} bytes)")
                 extracted_files.append(output_path)
-                print(f"   ⚪ Saved: {output_path} ({len(snapshot_data)} bytes)")
-                break
+            
+            manifest['regions'].append({
+                'file': os.path.basename(output_path),
+                'start': start,
+                'end': end,
+                'sha256': digest,
+                'markers': markers
+            })
+            for name in markers:
+                manifest['markers'][name] = {
+                    'offset': offsets[name],
+                    'file': os.path.basename(output_path),
+                    'region_offset': offsets[name] - start
+                }
+        
+        for name, container in self._find_nested_markers(offsets).items():
+            manifest['markers'][name]['contained_in'] = container
+        
+        self._save_manifest(manifest, output_dir)
+        
+        self.events.log(f"⚪ {len(offsets)} markers -> {len(regions)} regions, "
+                        f"{len(extracted_files)} unique files ({bytes_written} bytes written)")
         
         return extracted_files
+    
+    def _merge_regions(self, offsets, data_size):
+        intervals = sorted((offset, min(offset + self.region_size, data_size), name)
+                           for name, offset in offsets.items())
+        
+        regions = []
+        for start, end, name in intervals:
+            # Overlapping or adjacent windows collapse into one region
+            if regions and start <= regions[-1][1]:
+                regions[-1][1] = max(regions[-1][1], end)
+                regions[-1][2].append(name)
+            else:
+                regions.append([start, end, [name]])
+        
+        return [tuple(region) for region in regions]
+    
+    def _find_nested_markers(self, offsets):
+        spans = sorted(((offset, offset + len(name.split('_', 1)[1]), name)
+                        for name, offset in offsets.items()),
+                       key=lambda span: (span[0], -span[1]))
+        
+        nested = {}
+        outer = None
+        for start, end, name in spans:
+            if outer is not None and end <= outer[1]:
+                nested[name] = outer[2]
+            elif outer is None or end > outer[1]:
+                outer = (start, end, name)
+        
+        return nested
+    
+    def _save_manifest(self, manifest, output_dir):
+        manifest_file = os.path.join(output_dir, "snapshot_manifest.json")
+        
+        with self.manifest_lock:
+            manifests = {}
+            if os.path.exists(manifest_file):
+                try:
+                    with open(manifest_file, 'r', encoding='utf-8') as f:
+                        manifests = json.load(f)
+                except (OSError, ValueError):
+                    manifests = {}
+            
+            manifests[manifest['source']] = manifest
+            
+            with open(manifest_file, 'w', encoding='utf-8') as f:
+                json.dump(manifests, f, indent=2)
+        
+        self.events.log(f"⚪ Snapshot manifest: {manifest_file}")
 
-class DartSymbolRecovery:
+class ObfuscationMap:
+    CODE_IDENTIFIER = re.compile(r'\b(class|extends|implements|new)(\s+)([A-Za-z_$][A-Za-z0-9_$]*)')
+    
+    def __init__(self, events=None):
+        self.events = events or ProgressEvents()
+        self.mapping = {}
+        self.applied = {}
+        self.min_key_length = 0
+        self.max_key_length = 0
+    
+    def __len__(self):
+        return len(self.mapping)
+    
+    def load(self, map_path):
+        with open(map_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        
+        before = len(self.mapping)
+        
+        if isinstance(data, list):
+            # flutter build --save-obfuscation-map: [original, obfuscated, original, obfuscated, ...]
+            for i in range(0, len(data) - 1, 2):
+                self.add(data[i + 1], data[i])
+        elif isinstance(data, dict):
+            # Learned maps ({obfuscated: original}), either bare or inside a *_symbols.json
+            learned = data.get('obfuscation_map', data)
+            for obfuscated, original in learned.items():
+                if isinstance(original, str):
+                    self.add(obfuscated, original)
+        
+        self.events.log(f"⚪ Obfuscation map loaded: {map_path} ({len(self.mapping) - before} names)")
+        return len(self.mapping) - before
+    
+    def scoped(self):
+        # Shares the mapping but records hits separately, so concurrent libraries don't mix
+        view = copy.copy(self)
+        view.applied = {}
+        return view
+    
+    def add(self, obfuscated, original):
+        if not obfuscated or not original or obfuscated == original:
+            return
+        self.mapping[sys.intern(obfuscated)] = sys.intern(original)
+        if not self.min_key_length or len(obfuscated) < self.min_key_length:
+            self.min_key_length = len(obfuscated)
+        if len(obfuscated) > self.max_key_length:
+            self.max_key_length = len(obfuscated)
+    
+    def lookup(self, name):
+        if len(name) > self.max_key_length:
+            return None
+        original = self.mapping.get(name)
+        if original is not None:
+            self.applied[name] = original
+        return original
+    
+    def deobfuscate(self, string):
+        if not self.mapping:
+            return string
+        
+        original = self.lookup(string)
+        if original is not None:
+            return original
+        
+        if '.' in string and len(string) <= 2 * self.max_key_length + 1:
+            parts = string.split('.')
+            return '.'.join(self.lookup(part) or part for part in parts)
+        
+        return string
+    
+    def deobfuscate_code(self, text):
+        if not self.mapping:
+            return text
+        
+        string = self.deobfuscate(text)
+        if string != text:
+            return string
+        
+        # Only identifiers in declaration positions; prose like "is a test" stays untouched
+        return self.CODE_IDENTIFIER.sub(
+            lambda m: m.group(1) + m.group(2) + (self.lookup(m.group(3)) or m.group(3)), text)
+
+class UriTrieNode:
+    __slots__ = ('children', 'files', 'terminal')
+    
     def __init__(self):
+        self.children = {}
+        self.files = 0
+        self.terminal = False
+
+class PackageUriTrie:
+    URI = re.compile(r'\b(package|dart):([A-Za-z0-9_][A-Za-z0-9_./-]*)')
+    SDK_PACKAGES = {'flutter', 'flutter_test', 'flutter_driver', 'flutter_localizations',
+                    'flutter_web_plugins', 'sky_engine', 'integration_test'}
+    
+    def __init__(self):
+        self.root = UriTrieNode()
+    
+    def _segments(self, scheme, path, prefix=False):
+        path = path.rstrip('./-')
+        if scheme == 'dart':
+            return [f"dart:{path.split('/')[0]}"]
+        parts = [part for part in path.split('/') if part]
+        if not parts or (len(parts) < 2 and not prefix) or '..' in parts:
+            return None
+        return [f"package:{parts[0]}"] + parts[1:]
+    
+    def add_uri(self, scheme, path):
+        segments = self._segments(scheme, path)
+        if not segments:
+            return False
+        
+        node = self.root
+        visited = [node]
+        for segment in segments:
+            child = node.children.get(segment)
+            if child is None:
+                child = node.children[segment] = UriTrieNode()
+            node = child
+            visited.append(node)
+        
+        if node.terminal:
+            return False
+        node.terminal = True
+        for ancestor in visited:
+            ancestor.files += 1
+        return True
+    
+    def add_text(self, text):
+        if 'package:' not in text and 'dart:' not in text:
+            return 0
+        return sum(1 for match in self.URI.finditer(text) if self.add_uri(*match.groups()))
+    
+    def _find(self, prefix):
+        match = self.URI.match(prefix)
+        segments = self._segments(*match.groups(), prefix=True) if match else None
+        if not segments:
+            return None
+        
+        node = self.root
+        for segment in segments:
+            node = node.children.get(segment)
+            if node is None:
+                return None
+        return node
+    
+    def count_prefix(self, prefix):
+        node = self._find(prefix)
+        return node.files if node is not None else 0
+    
+    def iter_prefix(self, prefix):
+        node = self._find(prefix)
+        if node is None:
+            return
+        
+        base = prefix.rstrip('/')
+        stack = [(base, node)]
+        while stack:
+            path, node = stack.pop()
+            if node.terminal:
+                yield path
+            for segment in sorted(node.children, reverse=True):
+                separator = '' if path.endswith(':') else '/'
+                stack.append((f"{path}{separator}{segment}", node.children[segment]))
+    
+    def packages(self):
+        return {segment[len('package:'):]: node.files
+                for segment, node in self.root.children.items() if segment.startswith('package:')}
+    
+    def dart_libraries(self):
+        return sorted(segment for segment in self.root.children if segment.startswith('dart:'))
+    
+    def guess_app_package(self):
+        packages = self.packages()
+        candidates = {name: files for name, files in packages.items() if name not in self.SDK_PACKAGES}
+        for name in sorted(candidates):
+            if 'main.dart' in self.root.children[f"package:{name}"].children:
+                return name
+        if not candidates:
+            return None
+        return max(sorted(candidates), key=lambda name: candidates[name])
+    
+    def _entry_point(self, package):
+        node = self.root.children[f"package:{package}"]
+        if f"{package}.dart" in node.children and node.children[f"{package}.dart"].terminal:
+            return f"package:{package}/{package}.dart"
+        
+        # Shallowest referenced file, so imports prefer public library files over src/
+        level = [(f"package:{package}", node)]
+        while level:
+            next_level = []
+            for path, current in level:
+                for segment in sorted(current.children):
+                    child = current.children[segment]
+                    if child.terminal:
+                        return f"{path}/{segment}"
+                    next_level.append((f"{path}/{segment}", child))
+            level = next_level
+        return None
+    
+    def dependency_report(self, app_package=None):
+        app_package = app_package or self.guess_app_package()
+        packages = self.packages()
+        
+        dependencies = {name: {'files': files, 'entry': self._entry_point(name)}
+                        for name, files in sorted(packages.items())
+                        if name != app_package and name not in self.SDK_PACKAGES}
+        
+        imports = [f"import '{library}';" for library in self.dart_libraries()
+                   if not library[len('dart:'):].startswith('_')]
+        imports.extend(f"import '{info['entry']}';" for info in dependencies.values() if info['entry'])
+        
+        return {
+            'app_package': app_package,
+            'app_files': packages.get(app_package, 0) if app_package else 0,
+            'sdk_packages': sorted(name for name in packages if name in self.SDK_PACKAGES),
+            'dependencies': dependencies,
+            'dart_libraries': self.dart_libraries(),
+            'imports': imports
+        }
+
+class DartSymbolRecovery:
+    OPTIONAL_CATEGORIES = ['packages']
+    
+    def __init__(self, obfuscation_map=None, events=None, budget=None):
         self.symbols_dir = "dart_symbols"
+        self.events = events or ProgressEvents()
+        self.budget = budget or ExecutionBudget(events=self.events)
+        self.stage_budget = StageBudget('symbols', events=self.events)
+        self.uri_trie = PackageUriTrie()
+        self.obfuscation_map = obfuscation_map.scoped() if obfuscation_map is not None else ObfuscationMap()
     
-    def recover_symbols(self, app_so_path):
-        print(f"🔵 Symbol Recovery: {app_so_path}")
+    def recover_symbols(self, app_so_path, lib_name=None):
+        self.events.log(f"🔵 Symbol Recovery: {app_so_path}")
+        self.events.stage_start('symbols', app_so_path)
+        self.stage_budget = self.budget.stage('symbols')
         
         if not os.path.exists(self.symbols_dir):
-            os.makedirs(self.symbols_dir)
+            os.makedirs(self.symbols_dir, exist_ok=True)
         
         symbols = self._extract_symbols_from_strings(app_so_path)
         
         dynamic_symbols = self._extract_dynamic_symbols(app_so_path)
         
-        dart_structures = self._find_dart_structures(app_so_path)
+        if self.stage_budget.degraded:
+            self.stage_budget.note('skipped dart structures')
+            dart_structures = {}
+        else:
+            dart_structures = self._find_dart_structures(app_so_path)
         
         all_findings = {
             'strings_symbols': symbols,
             'dynamic_symbols': dynamic_symbols,
-            'dart_structures': dart_structures
+            'dart_structures': dart_structures,
+            'dependencies': self.uri_trie.dependency_report()
         }
         
-        self._save_findings(all_findings, os.path.basename(app_so_path))
+        if len(self.obfuscation_map):
+            all_findings['obfuscation_map'] = dict(sorted(self.obfuscation_map.applied.items()))
+        
+        if self.stage_budget.limited:
+            all_findings['budget'] = self.stage_budget.record()
+        
+        # lib_name is "<abi>/<file>", so each ABI keeps its own report
+        report_name = lib_name.replace('/', '_') if lib_name else os.path.basename(app_so_path)
+        self._save_findings(all_findings, report_name)
+        
+        self.events.stage_end('symbols', app_so_path, budget=self.stage_budget.state,
+                              **{key: len(values) for key, values in symbols.items()})
         
         return all_findings
     
     def _extract_symbols_from_strings(self, file_path):
-        print("🔵 Performing strings analysis...")
+        self.events.log("🔵 Performing strings analysis...")
         
         try:
-            result = subprocess.run(['strings', '-n', '4', file_path], 
-                                  capture_output=True, text=True)
-            all_strings = result.stdout.split('\n')
-            
             dart_patterns = {
                 'classes': [],
                 'functions': [],
@@ -169,10 +1127,15 @@ class DartSymbolRecovery:
                 'widgets': [],
                 'packages': []
             }
+            self.uri_trie = PackageUriTrie()
             
-            for string in all_strings:
-                if not string.strip():
-                    continue
+            count = 0
+            for count, string in enumerate(iter_strings(file_path, 4, self.stage_budget,
+                                                        obfuscation_map=self.obfuscation_map), 1):
+                if count % 4096 == 0:
+                    self.events.progress('symbols', file_path, 'strings', count)
+                
+                string = self.obfuscation_map.deobfuscate(string)
                     
                 if re.match(r'^[A-Z][a-zA-Z0-9_]*$', string) and len(string) > 3:
                     if string.endswith('Widget') or string.endswith('Page') or string.endswith('Screen'):
@@ -188,26 +1151,35 @@ class DartSymbolRecovery:
                 
                 elif 'dart:' in string or 'package:' in string:
                     dart_patterns['libraries'].append(string)
+                    self.uri_trie.add_text(string)
                 elif '/' in string and ('.dart' in string or string.count('/') > 1):
-                    dart_patterns['packages'].append(string)
+                    if not self.stage_budget.degraded:
+                        dart_patterns['packages'].append(string)
+            
+            if self.stage_budget.degraded:
+                self.stage_budget.note(f"skipped categories: {', '.join(self.OPTIONAL_CATEGORIES)}")
+            
+            self.events.progress('symbols', file_path, 'strings', count, count)
             
             for key in dart_patterns:
                 dart_patterns[key] = sorted(list(set(dart_patterns[key])))
             
-            print(f"⚪ Strings analysis completed:")
-            print(f"   🔵 Classes: {len(dart_patterns['classes'])}")
-            print(f"   🔵 Functions: {len(dart_patterns['functions'])}")
-            print(f"   🔵 Libraries: {len(dart_patterns['libraries'])}")
-            print(f"   🔵 Widgets: {len(dart_patterns['widgets'])}")
+            self.events.log(f"⚪ Strings analysis completed:")
+            self.events.log(f"   🔵 Classes: {len(dart_patterns['classes'])}")
+            self.events.log(f"   🔵 Functions: {len(dart_patterns['functions'])}")
+            self.events.log(f"   🔵 Libraries: {len(dart_patterns['libraries'])}")
+            self.events.log(f"   🔵 Widgets: {len(dart_patterns['widgets'])}")
+            if len(self.obfuscation_map):
+                self.events.log(f"   🔵 Deobfuscated names: {len(self.obfuscation_map.applied)}")
             
             return dart_patterns
             
         except Exception as e:
-            print(f"🔵 Strings analysis error: {e}")
+            self.events.log(f"🔵 Strings analysis error: {e}")
             return {}
     
     def _extract_dynamic_symbols(self, file_path):
-        print("🔵 Searching for dynamic symbols...")
+        self.events.log("🔵 Searching for dynamic symbols...")
         
         try:
             result = subprocess.run(['nm', '-D', file_path], 
@@ -220,31 +1192,24 @@ class DartSymbolRecovery:
                     if symbol and not symbol.startswith('_'):
                         symbols.append(symbol)
             
-            print(f"⚪ Dynamic symbols: {len(symbols)}")
+            self.events.log(f"⚪ Dynamic symbols: {len(symbols)}")
             return symbols[:50]
             
         except Exception as e:
-            print(f"🔵 NM tool error: {e}")
+            self.events.log(f"🔵 NM tool error: {e}")
             return []
     
     def _find_dart_structures(self, file_path):
-        print("🔵 Searching for Dart structures...")
+        self.events.log("🔵 Searching for Dart structures...")
         
         try:
-            result = subprocess.run(['strings', '-n', '10', file_path], 
-                                  capture_output=True, text=True)
-            
             structures = {
                 'vm_entries': [],
                 'snapshot_refs': [],
                 'type_info': []
             }
             
-            for line in result.stdout.split('\n'):
-                line = line.strip()
-                if not line:
-                    continue
-                
+            for line in iter_strings(file_path, 10, self.stage_budget):
                 if 'Dart_' in line:
                     structures['vm_entries'].append(line)
                 elif 'Snapshot' in line or 'snapshot' in line.lower():
@@ -252,15 +1217,15 @@ class DartSymbolRecovery:
                 elif 'Type' in line and len(line) < 100:
                     structures['type_info'].append(line)
             
-            print(f"⚪ Dart structures found:")
-            print(f"   🔵 VM Entries: {len(structures['vm_entries'])}")
-            print(f"   🔵 Snapshot Refs: {len(structures['snapshot_refs'])}")
-            print(f"   🔵 Type Info: {len(structures['type_info'])}")
+            self.events.log(f"⚪ Dart structures found:")
+            self.events.log(f"   🔵 VM Entries: {len(structures['vm_entries'])}")
+            self.events.log(f"   🔵 Snapshot Refs: {len(structures['snapshot_refs'])}")
+            self.events.log(f"   🔵 Type Info: {len(structures['type_info'])}")
             
             return structures
             
         except Exception as e:
-            print(f"🔵 Structure analysis error: {e}")
+            self.events.log(f"🔵 Structure analysis error: {e}")
             return {}
     
     def _save_findings(self, findings, filename):
@@ -287,17 +1252,238 @@ class DartSymbolRecovery:
                 f.write(f"\nFUNCTIONS ({len(symbols.get('functions', []))}):\n")
                 for func in symbols.get('functions', [])[:20]:
                     f.write(f"   • {func}\n")
+            
+            if 'dependencies' in findings:
+                dependencies = findings['dependencies']
+                f.write(f"\nAPP PACKAGE: {dependencies['app_package']} ({dependencies['app_files']} files)\n")
+                f.write(f"\nDEPENDENCIES ({len(dependencies['dependencies'])}):\n")
+                for name, info in dependencies['dependencies'].items():
+                    f.write(f"   • {name} ({info['files']} files)\n")
+        
+        self.events.emit('file_written', stage='symbols', path=output_file)
+        self.events.emit('file_written', stage='symbols', path=summary_file)
+        self.events.log(f"⚪ Reports saved:")
+        self.events.log(f"   🔵 {output_file}")
+        self.events.log(f"   🔵 {summary_file}")
+
+class MinHashIndex:
+    PACKAGE_PATH = re.compile(r'package:([A-Za-z0-9_]+)/([^\s\'"]+)')
+    
+    def __init__(self, index_path="fingerprint_index.sqlite", num_perm=128, bands=32, events=None):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        
+        self.index_path = index_path
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.events = events or ProgressEvents()
+        
+        self.db = sqlite3.connect(index_path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                app TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                signature BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS buckets (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                key TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS buckets_lookup ON buckets (band, bucket);
+            CREATE INDEX IF NOT EXISTS buckets_key ON buckets (key);
+            CREATE TABLE IF NOT EXISTS packages (
+                package TEXT NOT NULL,
+                app TEXT NOT NULL,
+                files INTEGER NOT NULL,
+                PRIMARY KEY (package, app)
+            );
+            CREATE TABLE IF NOT EXISTS apps (app TEXT PRIMARY KEY, path TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+        """)
+        
+        stored = dict(self.db.execute("SELECT name, value FROM meta"))
+        if stored and (int(stored['num_perm']), int(stored['bands'])) != (num_perm, bands):
+            raise ValueError(f"{index_path} was built with num_perm={stored['num_perm']}, "
+                             f"bands={stored['bands']}")
+        self.db.executemany("INSERT OR IGNORE INTO meta VALUES (?, ?)",
+                            [('num_perm', str(num_perm)), ('bands', str(bands))])
+        self.db.commit()
+    
+    def close(self):
+        self.db.close()
+    
+    @staticmethod
+    def app_id(apk_path):
+        # Fleets are full of base.apk and app-release.apk; the content identifies the app
+        digest = hashlib.sha256()
+        with open(apk_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return f"sha256:{digest.hexdigest()}"
+    
+    def signature(self, tokens):
+        # One-permutation hashing: one 64-bit hash per token, binned into num_perm slots
+        empty = (1 << 64) - 1
+        slots = [empty] * self.num_perm
+        for token in tokens:
+            value = int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+            slot = value % self.num_perm
+            value //= self.num_perm
+            if value < slots[slot]:
+                slots[slot] = value
+        
+        if all(value == empty for value in slots):
+            return None
         
-        print(f"⚪ Reports saved:")
-        print(f"   🔵 {output_file}")
-        print(f"   🔵 {summary_file}")
+        # Rotation densification: empty slots borrow from the next filled one
+        filled = list(slots)
+        for i in range(self.num_perm):
+            if filled[i] != empty:
+                continue
+            offset = 1
+            while filled[(i + offset) % self.num_perm] == empty:
+                offset += 1
+            slots[i] = (filled[(i + offset) % self.num_perm] + offset * 0x9E3779B97F4A7C15) & empty
+        
+        return slots
+    
+    def _band_buckets(self, signature):
+        for band in range(self.bands):
+            chunk = signature[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.blake2b(struct.pack(f'<{self.rows}Q', *chunk), digest_size=8).digest()
+            yield band, int.from_bytes(digest, 'little', signed=True)
+    
+    def _pack(self, signature):
+        return struct.pack(f'<{self.num_perm}Q', *signature)
+    
+    def _unpack(self, blob):
+        return struct.unpack(f'<{self.num_perm}Q', blob)
+    
+    def add(self, key, tokens, kind='app', app=None):
+        tokens = set(tokens)
+        signature = self.signature(tokens)
+        
+        self.db.execute("DELETE FROM buckets WHERE key = ?", (key,))
+        if signature is None:
+            self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            return None
+        
+        self.db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                        (key, kind, app or key, len(tokens), self._pack(signature)))
+        self.db.executemany("INSERT INTO buckets VALUES (?, ?, ?)",
+                            [(band, bucket, key) for band, bucket in self._band_buckets(signature)])
+        return signature
+    
+    def query(self, tokens=None, signature=None, kind=None, limit=10, threshold=0.0, exclude_app=None):
+        if signature is None:
+            signature = self.signature(set(tokens or []))
+        if signature is None:
+            return []
+        
+        candidates = set()
+        for band, bucket in self._band_buckets(signature):
+            candidates.update(key for (key,) in self.db.execute(
+                "SELECT key FROM buckets WHERE band = ? AND bucket = ?", (band, bucket)))
+        
+        matches = []
+        for key in candidates:
+            row = self.db.execute("SELECT kind, entries.app, size, signature, path FROM entries "
+                                  "LEFT JOIN apps ON apps.app = entries.app WHERE key = ?",
+                                  (key,)).fetchone()
+            if row is None or (kind is not None and row[0] != kind) or row[1] == exclude_app:
+                continue
+            other = self._unpack(row[3])
+            similarity = sum(1 for a, b in zip(signature, other) if a == b) / self.num_perm
+            if similarity >= threshold:
+                matches.append({'key': key, 'kind': row[0], 'app': row[1], 'path': row[4],
+                                'size': row[2], 'similarity': round(similarity, 3)})
+        
+        matches.sort(key=lambda match: (-match['similarity'], match['key']))
+        return matches[:limit]
+    
+    def apps_embedding(self, package):
+        return [{'app': app, 'files': files} for app, files in self.db.execute(
+            "SELECT app, files FROM packages WHERE package = ? ORDER BY app", (package,))]
+    
+    def _is_sdk(self, string):
+        # Every Flutter app embeds the SDK, so its URIs would inflate all similarities
+        match = self.PACKAGE_PATH.search(string)
+        if match:
+            return match.group(1) in PackageUriTrie.SDK_PACKAGES
+        return 'dart:' in string
+    
+    def _app_tokens(self, findings):
+        symbols = findings.get('strings_symbols', {})
+        tokens = set()
+        for prefix, category in [('c', 'classes'), ('f', 'functions'), ('l', 'libraries'), ('w', 'widgets')]:
+            tokens.update(f"{prefix}:{item}" for item in symbols.get(category, []) if not self._is_sdk(item))
+        return tokens
+    
+    def _package_tokens(self, findings):
+        symbols = findings.get('strings_symbols', {})
+        packages = defaultdict(set)
+        for string in symbols.get('libraries', []) + symbols.get('packages', []):
+            for match in self.PACKAGE_PATH.finditer(string):
+                if match.group(1) not in PackageUriTrie.SDK_PACKAGES:
+                    packages[match.group(1)].add(match.group(2))
+        return packages
+    
+    def index_findings(self, app, findings, path=None):
+        self.events.stage_start('index', app)
+        
+        # Drop everything from a previous run, including packages the app no longer uses
+        self.db.execute("DELETE FROM buckets WHERE key IN (SELECT key FROM entries WHERE app = ?)", (app,))
+        self.db.execute("DELETE FROM entries WHERE app = ?", (app,))
+        self.db.execute("DELETE FROM packages WHERE app = ?", (app,))
+        self.db.execute("INSERT OR REPLACE INTO apps VALUES (?, ?)", (app, path or app))
+        
+        app_tokens = self._app_tokens(findings)
+        signature = self.add(app, app_tokens, kind='app', app=app)
+        
+        package_tokens = self._package_tokens(findings)
+        for package, paths in package_tokens.items():
+            self.add(f"{app}::package:{package}", paths, kind='package', app=app)
+            self.db.execute("INSERT OR REPLACE INTO packages VALUES (?, ?, ?)", (package, app, len(paths)))
+        self.db.commit()
+        
+        self.events.stage_end('index', app, tokens=len(app_tokens), packages=len(package_tokens))
+        return signature
+    
+    def report_similar(self, app, findings, limit=5):
+        similar = self.query(self._app_tokens(findings), kind='app', limit=limit, exclude_app=app)
+        
+        self.events.log(f"⚪ Fingerprint index: {self.index_path}")
+        if similar:
+            self.events.log("🔵 Most similar known apps:")
+            for match in similar:
+                self.events.log(f"   ⚪ {match['path'] or match['app']}: {match['similarity']:.0%} estimated overlap")
+        else:
+            self.events.log("🔵 No similar app in the index")
+        
+        shared = {}
+        for package in self._package_tokens(findings):
+            others = [entry['app'] for entry in self.apps_embedding(package) if entry['app'] != app]
+            if others:
+                shared[package] = others
+        if shared:
+            self.events.log(f"🔵 Packages shared with indexed apps: {len(shared)}")
+        
+        self.events.emit('similar_apps', app=app, matches=similar, shared_packages=shared)
+        return similar, shared
 
 class WidgetTreeBuilder:
-    def __init__(self):
+    def __init__(self, obfuscation_map=None, events=None):
         self.widgets_dir = "widget_analysis"
+        self.events = events or ProgressEvents()
+        self.obfuscation_map = obfuscation_map if obfuscation_map is not None else ObfuscationMap()
     
     def analyze_widgets(self, symbols_json_path):
-        print(f"🔵 Widget Analysis: {symbols_json_path}")
+        self.events.log(f"🔵 Widget Analysis: {symbols_json_path}")
+        self.events.stage_start('widgets', symbols_json_path)
         
         if not os.path.exists(self.widgets_dir):
             os.makedirs(self.widgets_dir)
@@ -309,15 +1495,21 @@ class WidgetTreeBuilder:
         classes = data.get('strings_symbols', {}).get('classes', [])
         functions = data.get('strings_symbols', {}).get('functions', [])
         
-        categorized = self._categorize_widgets(widgets, classes)
+        # Reports written with a map loaded are already deobfuscated
+        deobfuscate = 'obfuscation_map' not in data and len(self.obfuscation_map) > 0
+        
+        categorized = self._categorize_widgets(widgets, classes, deobfuscate)
         
         widget_tree = self._build_widget_tree(categorized)
         
         self._generate_widget_report(categorized, widget_tree, os.path.basename(symbols_json_path))
         
+        self.events.stage_end('widgets', symbols_json_path,
+                              **{category: len(items) for category, items in categorized.items()})
+        
         return categorized, widget_tree
     
-    def _categorize_widgets(self, widgets, all_classes):
+    def _categorize_widgets(self, widgets, all_classes, deobfuscate=False):
         categories = {
             'pages': [],
             'screens': [],
@@ -330,6 +1522,10 @@ class WidgetTreeBuilder:
             'others': []
         }
         
+        if deobfuscate:
+            widgets = [self.obfuscation_map.deobfuscate(widget) for widget in widgets]
+            all_classes = [self.obfuscation_map.deobfuscate(cls) for cls in all_classes]
+        
         all_potential_widgets = widgets + [cls for cls in all_classes if self._is_likely_widget(cls)]
         
         for widget in all_potential_widgets:
@@ -418,7 +1614,8 @@ class WidgetTreeBuilder:
                     if len(items) > 15:
                         f.write(f"   ... and {len(items) - 15} more\n")
         
-        print(f"⚪ Widget analysis report: {report_file}")
+        self.events.emit('file_written', stage='widgets', path=report_file)
+        self.events.log(f"⚪ Widget analysis report: {report_file}")
         
         json_file = os.path.join(self.widgets_dir, f"widget_tree_{filename.replace('.json', '')}.json")
         with open(json_file, 'w', encoding='utf-8') as f:
@@ -427,87 +1624,260 @@ class WidgetTreeBuilder:
                 'widget_tree': dict(widget_tree)
             }, f, indent=2, ensure_ascii=False)
         
-        print(f"⚪ Widget tree JSON: {json_file}")
+        self.events.emit('file_written', stage='widgets', path=json_file)
+        self.events.log(f"⚪ Widget tree JSON: {json_file}")
+
+class CategorySampler:
+    def __init__(self, top_k=20, sample_size=20, seed=0):
+        self.top_k = top_k
+        self.sample_size = sample_size
+        self.count = 0
+        self.top = []
+        self.top_members = set()
+        self.sample = []
+        self._random = random.Random(seed)
+    
+    def add(self, item):
+        self.count += 1
+        
+        # Top-K keeps the longest fragments, which carry the most context
+        key = (len(item), item)
+        if item not in self.top_members:
+            if len(self.top) < self.top_k:
+                heapq.heappush(self.top, key)
+                self.top_members.add(item)
+            elif key > self.top[0]:
+                _, evicted = heapq.heapreplace(self.top, key)
+                self.top_members.discard(evicted)
+                self.top_members.add(item)
+        
+        # Reservoir sampling (Algorithm R) for an unbiased view of the category
+        if len(self.sample) < self.sample_size:
+            self.sample.append(item)
+        else:
+            slot = self._random.randrange(self.count)
+            if slot < self.sample_size:
+                self.sample[slot] = item
+    
+    def top_items(self):
+        return [item for _, item in sorted(self.top, reverse=True)]
+    
+    def representative_items(self):
+        items = self.top_items()
+        items.extend(item for item in self.sample if item not in self.top_members)
+        return items
 
 class SmartDartReconstructor:
-    def __init__(self):
+    CATEGORIES = ['widget_tree', 'method_fragments', 'class_fragments',
+                  'import_hints', 'ui_context', 'build_patterns']
+    
+    OPTIONAL_CATEGORIES = ['ui_context', 'build_patterns']
+    
+    def __init__(self, streaming=False, top_k=20, sample_size=20, spill_categories=None,
+                 obfuscation_map=None, events=None, budget=None):
         self.temp_dir = "temp_extract"
         self.output_dir = "reconstructed_code"
+        self.events = events or ProgressEvents()
+        self.budget = budget or ExecutionBudget(events=self.events)
+        self.stage_budget = StageBudget('reconstruct', events=self.events)
+        self.obfuscation_map = obfuscation_map if obfuscation_map is not None else ObfuscationMap()
+        self.streaming = streaming
+        self.top_k = top_k
+        self.sample_size = sample_size
+        self.spill_categories = spill_categories or []
     
-    def reconstruct_dart_code(self):
-        print("🔵 Smart Dart Code Reconstruction...")
+    def reconstruct_dart_code(self, libapp_path=None):
+        self.events.log("🔵 Smart Dart Code Reconstruction...")
         
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
         
-        libapp_path = "temp_extract/lib/arm64-v8a/libapp.so"
-        all_strings = self._extract_all_strings(libapp_path)
-        
-        if not all_strings:
-            print("🔵 No strings found!")
+        if libapp_path is None:
+            libapp_path = self._find_dart_app_lib()
+        if libapp_path is None:
+            self.events.log("🔵 No Dart AOT library found!")
             return
+        self.events.log(f"   🔵 Source library: {libapp_path}")
+        self.events.stage_start('reconstruct', libapp_path)
+        self.stage_budget = self.budget.stage('reconstruct')
+        
+        if self.streaming:
+            reconstructed = self._streaming_reconstruction(self._iter_strings(libapp_path), libapp_path)
+            if not reconstructed['counts']['strings'] and not self.stage_budget.exhausted:
+                self.events.log("🔵 No strings found!")
+                self.events.stage_end('reconstruct', libapp_path, strings=0)
+                return
+        else:
+            all_strings = self._extract_all_strings(libapp_path)
+            
+            if not all_strings and not self.stage_budget.exhausted:
+                self.events.log("🔵 No strings found!")
+                self.events.stage_end('reconstruct', libapp_path, strings=0)
+                return
+            
+            reconstructed = self._smart_reconstruction(all_strings, libapp_path)
         
-        reconstructed = self._smart_reconstruction(all_strings)
+        if self.stage_budget.limited:
+            reconstructed['budget'] = self.stage_budget.record()
         
         self._generate_reconstruction_report(reconstructed)
         
+        counts = reconstructed.get('counts', {})
+        self.events.stage_end('reconstruct', libapp_path, budget=self.stage_budget.state,
+                              **{category: counts.get(category, len(reconstructed[category]))
+                                 for category in self.CATEGORIES})
+        
         return reconstructed
     
+    def _find_dart_app_lib(self):
+        lib_path = os.path.join(self.temp_dir, "lib")
+        if not os.path.exists(lib_path):
+            return None
+        
+        fingerprinter = LibraryFingerprinter(self.events)
+        fingerprints = {}
+        for arch in os.listdir(lib_path):
+            arch_path = os.path.join(lib_path, arch)
+            if os.path.isdir(arch_path):
+                for file in os.listdir(arch_path):
+                    if file.endswith('.so'):
+                        full_path = os.path.join(arch_path, file)
+                        fingerprints[full_path] = fingerprinter.fingerprint_file(full_path)
+        
+        dart_apps = fingerprinter.select_dart_apps(fingerprints)
+        return dart_apps[0] if dart_apps else None
+    
     def _extract_all_strings(self, libapp_path):
         try:
-            import subprocess
-            result = subprocess.run(['strings', '-n', '4', libapp_path], 
-                                  capture_output=True, text=True)
-            return [s.strip() for s in result.stdout.split('\n') if s.strip()]
+            return list(iter_strings(libapp_path, 4, self.stage_budget,
+                                     obfuscation_map=self.obfuscation_map))
         except Exception as e:
-            print(f"🔵 Strings extraction failed: {e}")
+            self.events.log(f"🔵 Strings extraction failed: {e}")
             return []
     
-    def _smart_reconstruction(self, all_strings):
-        print("   🔵 Smart pattern matching...")
-        
-        reconstructed = {
-            'widget_tree': [],
-            'method_fragments': [],
-            'class_fragments': [],
-            'import_hints': [],
-            'ui_context': [],
-            'build_patterns': []
-        }
-        
+    def _iter_strings(self, libapp_path):
+        try:
+            yield from iter_strings(libapp_path, 4, self.stage_budget,
+                                    obfuscation_map=self.obfuscation_map)
+        except Exception as e:
+            self.events.log(f"🔵 Strings extraction failed: {e}")
+    
+    def _iter_fragments(self, strings, source=None, total=None):
         context_buffer = ""
         
-        for i, string in enumerate(all_strings):
+        deobfuscate = len(self.obfuscation_map) > 0
+        
+        budget = self.stage_budget if self.stage_budget.limited else None
+        skipped = set()
+        
+        count = 0
+        for i, string in enumerate(strings):
+            if i % 4096 == 0:
+                self.events.progress('reconstruct', source, 'strings', i, total)
+                if budget is not None and budget.check() != 'ok':
+                    if budget.exhausted:
+                        budget.note('truncated classification')
+                        break
+                    skipped.update(self.OPTIONAL_CATEGORIES)
+                    budget.note(f"skipped categories: {', '.join(self.OPTIONAL_CATEGORIES)}")
+            count = i + 1
+            
+            if deobfuscate:
+                string = self.obfuscation_map.deobfuscate_code(string)
+            
             if len(string) < 3:
                 continue
             
             if self._is_widget_related(string):
-                reconstructed['widget_tree'].append(string)
+                yield 'widget_tree', string
             
             if self._is_method_fragment(string):
-                reconstructed['method_fragments'].append(string)
+                yield 'method_fragments', string
             
             if self._is_class_fragment(string):
-                reconstructed['class_fragments'].append(string)
+                yield 'class_fragments', string
             
             if any(pkg in string for pkg in ['package:', 'dart:', 'flutter/', 'material']):
-                reconstructed['import_hints'].append(string)
+                yield 'import_hints', string
             
-            if self._is_ui_context(string):
-                reconstructed['ui_context'].append(string)
+            if 'ui_context' not in skipped and self._is_ui_context(string):
+                yield 'ui_context', string
             
-            if 'build' in string.lower() and any(ctx in string for ctx in ['context', 'Widget', 'return']):
-                reconstructed['build_patterns'].append(string)
+            if 'build_patterns' not in skipped and 'build' in string.lower() and any(ctx in string for ctx in ['context', 'Widget', 'return']):
+                yield 'build_patterns', string
             
             if i > 0 and self._could_be_related(context_buffer, string):
                 context_buffer += " " + string
                 if len(context_buffer) > 100:
                     if self._looks_like_code(context_buffer):
-                        reconstructed['method_fragments'].append(context_buffer)
+                        yield 'method_fragments', context_buffer
                     context_buffer = ""
             else:
                 context_buffer = string
         
+        self.events.progress('reconstruct', source, 'strings', count, count)
+    
+    def _smart_reconstruction(self, all_strings, source=None):
+        self.events.log("   🔵 Smart pattern matching...")
+        
+        reconstructed = {category: [] for category in self.CATEGORIES}
+        uri_trie = PackageUriTrie()
+        
+        for category, fragment in self._iter_fragments(all_strings, source, len(all_strings)):
+            reconstructed[category].append(fragment)
+            if category == 'import_hints':
+                uri_trie.add_text(fragment)
+        
+        reconstructed['dependencies'] = uri_trie.dependency_report()
+        
+        return reconstructed
+    
+    def _streaming_reconstruction(self, strings, source=None):
+        self.events.log("   🔵 Smart pattern matching (streaming)...")
+        
+        samplers = {category: CategorySampler(self.top_k, self.sample_size)
+                    for category in self.CATEGORIES}
+        
+        spill_names = self.CATEGORIES if 'all' in self.spill_categories else \
+            [c for c in self.CATEGORIES if c in self.spill_categories]
+        spill_paths = {category: os.path.join(self.output_dir, f"{category}.txt")
+                       for category in spill_names}
+        spill_files = {}
+        uri_trie = PackageUriTrie()
+        
+        counter = {'strings': 0}
+        
+        def counted(source):
+            for string in source:
+                counter['strings'] += 1
+                yield string
+        
+        try:
+            for category, path in spill_paths.items():
+                spill_files[category] = open(path, 'w', encoding='utf-8')
+            
+            for category, fragment in self._iter_fragments(counted(strings), source):
+                samplers[category].add(fragment)
+                if category == 'import_hints':
+                    uri_trie.add_text(fragment)
+                spill_file = spill_files.get(category)
+                if spill_file is not None:
+                    spill_file.write(fragment.replace('\n', ' ') + '\n')
+        finally:
+            for spill_file in spill_files.values():
+                spill_file.close()
+        
+        reconstructed = {category: samplers[category].representative_items()
+                         for category in self.CATEGORIES}
+        reconstructed['counts'] = {category: samplers[category].count
+                                   for category in self.CATEGORIES}
+        reconstructed['counts']['strings'] = counter['strings']
+        reconstructed['spilled'] = spill_paths
+        reconstructed['dependencies'] = uri_trie.dependency_report()
+        
+        for category, path in spill_paths.items():
+            self.events.log(f"   🔵 Spilled {category}: {path}")
+        
         return reconstructed
     
     def _is_widget_related(self, string):
@@ -584,33 +1954,55 @@ class SmartDartReconstructor:
                 for imp in reconstructed['import_hints'][:10]:
                     f.write(f"{imp}\n")
             
+            dependencies = reconstructed.get('dependencies')
+            if dependencies and dependencies['dependencies']:
+                f.write("\nRECOVERED DEPENDENCIES:\n")
+                f.write("-" * 30 + "\n")
+                for name, info in dependencies['dependencies'].items():
+                    f.write(f"{name:30} {info['files']:5} files\n")
+            
             f.write(f"\nRECONSTRUCTION STATISTICS:\n")
             f.write("-" * 35 + "\n")
-            for category, items in reconstructed.items():
-                f.write(f"   {category.upper():20}: {len(items):4} items\n")
+            counts = reconstructed.get('counts', {})
+            for category in self.CATEGORIES:
+                total = counts.get(category, len(reconstructed.get(category, [])))
+                f.write(f"   {category.upper():20}: {total:4} items\n")
+            
+            budget = reconstructed.get('budget')
+            if budget and budget['state'] != 'ok':
+                f.write(f"\nBUDGET: {budget['state']} ({'; '.join(budget['actions'])})\n")
         
-        print(f"⚪ Smart reconstruction report: {report_file}")
+        self.events.emit('file_written', stage='reconstruct', path=report_file)
+        self.events.log(f"⚪ Smart reconstruction report: {report_file}")
         
         json_file = os.path.join(self.output_dir, "smart_reconstruction.json")
         with open(json_file, 'w', encoding='utf-8') as f:
             json.dump(reconstructed, f, indent=2, ensure_ascii=False)
         
-        print(f"⚪ JSON export: {json_file}")
+        self.events.emit('file_written', stage='reconstruct', path=json_file)
+        self.events.log(f"⚪ JSON export: {json_file}")
 
 class DartCodeGenerator:
-    def __init__(self):
+    FRAMEWORK_CLASSES = {'Widget', 'StatelessWidget', 'StatefulWidget', 'State', 'InheritedWidget'}
+    
+    def __init__(self, max_workers=None, events=None):
         self.recon_dir = "reconstructed_code"
+        self.events = events or ProgressEvents()
         self.output_dir = "generated_code"
+        self.hashes_file = os.path.join(self.output_dir, ".generated_hashes.json")
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
     
     def generate_dart_code(self):
-        print("🔵 Generating Pseudo-Dart Code...")
+        self.events.log("🔵 Generating Pseudo-Dart Code...")
+        self.events.stage_start('generate', self.output_dir)
         
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
         
         json_path = os.path.join(self.recon_dir, "smart_reconstruction.json")
         if not os.path.exists(json_path):
-            print("🔵 Reconstruction JSON not found!")
+            self.events.log("🔵 Reconstruction JSON not found!")
+            self.events.stage_end('generate', self.output_dir, error="reconstruction JSON not found")
             return
         
         with open(json_path, 'r', encoding='utf-8') as f:
@@ -618,61 +2010,173 @@ class DartCodeGenerator:
         
         generated_code = self._generate_from_fragments(reconstructed)
         
-        self._write_generated_code(generated_code)
+        stats = self._write_generated_code(generated_code)
+        
+        self.events.stage_end('generate', self.output_dir, **stats)
         
         return generated_code
     
     def _generate_from_fragments(self, reconstructed):
-        print("   🔵 Generating code from fragments...")
+        self.events.log("   🔵 Generating code from fragments...")
+        
+        pages = self._collect_page_names(reconstructed)
+        widgets = [w for w in self._collect_widget_names(reconstructed) if w not in pages]
+        models = [m for m in self._collect_model_names(reconstructed)
+                  if m not in pages and m not in widgets]
+        
+        layout = self._plan_layout(reconstructed, widgets, pages, models)
+        
+        dependencies = reconstructed.get('dependencies') or {}
+        
+        units = [
+            ("lib/main.dart", self._render_main_app, (pages, layout, dependencies.get('imports', []))),
+            ("pubspec.yaml", self._render_pubspec, (dependencies,))
+        ]
+        for name in widgets:
+            units.append((f"lib/{layout[name]}", self._render_widget, (name,)))
+        for name in pages:
+            units.append((f"lib/{layout[name]}", self._render_page, (name,)))
+        for name in models:
+            units.append((f"lib/{layout[name]}", self._render_model, (name,)))
+        units.append(("SUMMARY.md", self._generate_summary, (reconstructed,)))
         
         generated = {
-            'main_app': self._generate_main_app(reconstructed),
-            'widgets': self._generate_widget_classes(reconstructed),
-            'pages': self._generate_page_classes(reconstructed),
-            'models': self._generate_model_classes(reconstructed),
-            'summary': self._generate_summary(reconstructed)
+            'units': units,
+            'widgets': widgets,
+            'pages': pages,
+            'models': models,
+            'layout': layout
         }
         
         return generated
     
-    def _generate_main_app(self, reconstructed):
-        main_app = """import 'package:flutter/material.dart';
-
-void main() {
+    def _is_class_name(self, word):
+        return (re.match(r'^[A-Z][A-Za-z0-9_]*$', word) is not None and
+                word not in self.FRAMEWORK_CLASSES)
+    
+    def _snake_case(self, name):
+        name = re.sub(r'([A-Z]+)([A-Z][a-z])', r'\1_\2', name)
+        name = re.sub(r'([a-z0-9])([A-Z])', r'\1_\2', name)
+        return name.lower()
+    
+    def _collect_widget_names(self, reconstructed):
+        unique_widgets = set()
+        for fragment in reconstructed.get('widget_tree', []):
+            for word in fragment.split():
+                if word.endswith('Widget') or word.endswith('Page') or word.endswith('Screen'):
+                    if self._is_class_name(word):
+                        unique_widgets.add(word)
+        
+        return sorted(unique_widgets)
+    
+    def _collect_page_names(self, reconstructed):
+        page_indicators = ['Page', 'Screen', 'View']
+        page_fragments = [f for f in reconstructed.get('widget_tree', []) 
+                         if any(indicator in f for indicator in page_indicators)]
+        
+        unique_pages = set()
+        for fragment in page_fragments:
+            for word in fragment.split():
+                if any(indicator in word for indicator in page_indicators) and self._is_class_name(word):
+                    unique_pages.add(word)
+        
+        return sorted(unique_pages)
+    
+    def _collect_model_names(self, reconstructed):
+        unique_models = set()
+        for fragment in reconstructed.get('class_fragments', []):
+            for match in re.finditer(r'\bclass\s+([A-Za-z_][A-Za-z0-9_]*)', fragment):
+                if self._is_class_name(match.group(1)):
+                    unique_models.add(match.group(1))
+        
+        return sorted(unique_models)
+    
+    def _plan_layout(self, reconstructed, widgets, pages, models):
+        # Mirror the original lib/ tree, but only from the app's own package:
+        # package:flutter/src/widgets/... describes the SDK's layout, not the app's
+        recovered_paths = {}
+        app_package = (reconstructed.get('dependencies') or {}).get('app_package')
+        if app_package:
+            app_uri = re.compile(rf'package:{re.escape(app_package)}/([A-Za-z0-9_/]+)\.dart')
+            for hint in reconstructed.get('import_hints', []):
+                for match in app_uri.finditer(hint):
+                    rel_path = match.group(1)
+                    recovered_paths.setdefault(rel_path.rsplit('/', 1)[-1], f"{rel_path}.dart")
+        
+        layout = {}
+        # HTTPWidget and HttpWidget share a snake_case stem; each class needs its own file
+        used_paths = {'main.dart'}
+        for folder, names in [('widgets', widgets), ('pages', pages), ('models', models)]:
+            for name in names:
+                file_stem = self._snake_case(name)
+                path = recovered_paths.get(file_stem, f"{folder}/{file_stem}.dart")
+                base, suffix = path[:-len('.dart')], 2
+                while path.lower() in used_paths:
+                    path = f"{base}_{suffix}.dart"
+                    suffix += 1
+                used_paths.add(path.lower())
+                layout[name] = path
+        
+        return layout
+    
+    def _render_main_app(self, pages, layout, package_imports):
+        imports = "".join(f"{statement}\n" for statement in package_imports
+                          if statement != "import 'package:flutter/material.dart';")
+        imports += "".join(f"import '{layout[page]}';\n" for page in pages)
+        routes = "".join(f"        '/{self._snake_case(page)}': (context) => {page}(),\n" for page in pages)
+        home = f"{pages[0]}()" if pages else "Scaffold(body: Center(child: Text('Generated Flutter App')))"
+        
+        main_app = f"""import 'package:flutter/material.dart';
+{imports}
+void main() {{
   runApp(MyApp());
-}
+}}
 
-class MyApp extends StatelessWidget {
+class MyApp extends StatelessWidget {{
   @override
-  Widget build(BuildContext context) {
+  Widget build(BuildContext context) {{
     return MaterialApp(
       title: 'Generated Flutter App',
       theme: ThemeData(
         primarySwatch: Colors.blue,
       ),
-      home: MainPage(),
-      routes: {
-      },
+      home: {home},
+      routes: {{
+{routes}      }},
     );
-  }
-}
+  }}
+}}
 """
         return main_app
     
-    def _generate_widget_classes(self, reconstructed):
-        widgets = []
-        
-        widget_fragments = reconstructed.get('widget_tree', [])
-        
-        unique_widgets = set()
-        for fragment in widget_fragments:
-            words = fragment.split()
-            for word in words:
-                if word.endswith('Widget') or word.endswith('Page') or word.endswith('Screen'):
-                    unique_widgets.add(word)
-        
-        for widget_name in list(unique_widgets)[:10]:
-            widget_code = f"""
+    def _render_pubspec(self, dependencies):
+        name = dependencies.get('app_package') or 'recovered_app'
+        lines = [
+            f"name: {name}",
+            "description: Reconstructed from binary analysis.",
+            "publish_to: 'none'",
+            "version: 1.0.0+1",
+            "",
+            "environment:",
+            "  sdk: '>=2.12.0 <4.0.0'",
+            "",
+            "dependencies:",
+            "  flutter:",
+            "    sdk: flutter"
+        ]
+        for package, info in dependencies.get('dependencies', {}).items():
+            lines.append(f"  {package}: any  # {info['files']} files referenced")
+        lines.extend([
+            "",
+            "flutter:",
+            "  uses-material-design: true",
+            ""
+        ])
+        return "\n".join(lines)
+    
+    def _render_widget(self, widget_name):
+        widget_code = f"""import 'package:flutter/material.dart';
+
 class {widget_name} extends StatelessWidget {{
   @override
   Widget build(BuildContext context) {{
@@ -682,26 +2186,11 @@ class {widget_name} extends StatelessWidget {{
   }}
 }}
 """
-            widgets.append(widget_code)
-        
-        return "\n".join(widgets)
+        return widget_code
     
-    def _generate_page_classes(self, reconstructed):
-        pages = []
-        
-        page_indicators = ['Page', 'Screen', 'View']
-        page_fragments = [f for f in reconstructed.get('widget_tree', []) 
-                         if any(indicator in f for indicator in page_indicators)]
-        
-        unique_pages = set()
-        for fragment in page_fragments:
-            words = fragment.split()
-            for word in words:
-                if any(indicator in word for indicator in page_indicators):
-                    unique_pages.add(word)
-        
-        for page_name in list(unique_pages)[:5]:
-            page_code = f"""
+    def _render_page(self, page_name):
+        page_code = f"""import 'package:flutter/material.dart';
+
 class {page_name} extends StatefulWidget {{
   @override
   _{page_name}State createState() => _{page_name}State();
@@ -721,19 +2210,10 @@ class _{page_name}State extends State<{page_name}> {{
   }}
 }}
 """
-            pages.append(page_code)
-        
-        return "\n".join(pages)
+        return page_code
     
-    def _generate_model_classes(self, reconstructed):
-        models = []
-        
-        class_fragments = reconstructed.get('class_fragments', [])
-        
-        for i, fragment in enumerate(class_fragments[:5]):
-            class_name = f"Model{i+1}"
-            model_code = f"""
-class {class_name} {{
+    def _render_model(self, class_name):
+        model_code = f"""class {class_name} {{
   final String id;
   final String name;
   
@@ -744,17 +2224,20 @@ class {class_name} {{
   
 }}
 """
-            models.append(model_code)
-        
-        return "\n".join(models)
+        return model_code
     
     def _generate_summary(self, reconstructed):
+        counts = reconstructed.get('counts', {})
+        
+        def total(category):
+            return counts.get(category, len(reconstructed.get(category, [])))
+        
         stats = {
-            'total_widgets': len(reconstructed.get('widget_tree', [])),
-            'total_methods': len(reconstructed.get('method_fragments', [])),
-            'total_classes': len(reconstructed.get('class_fragments', [])),
-            'total_imports': len(reconstructed.get('import_hints', [])),
-            'ui_strings': len(reconstructed.get('ui_context', []))
+            'total_widgets': total('widget_tree'),
+            'total_methods': total('method_fragments'),
+            'total_classes': total('class_fragments'),
+            'total_imports': total('import_hints'),
+            'ui_strings': total('ui_context')
         }
         
         summary = f"""FLUTTER APP RECONSTRUCTION SUMMARY
@@ -777,111 +2260,273 @@ Actual implementation may vary.
 """
         return summary
     
+    def _load_previous_hashes(self):
+        if not os.path.exists(self.hashes_file):
+            return {}
+        
+        try:
+            with open(self.hashes_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _write_unit(self, unit, previous_hashes, total):
+        rel_path, render, args = unit
+        content = render(*args)
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        output_path = os.path.join(self.output_dir, *rel_path.split('/'))
+        
+        changed = previous_hashes.get(rel_path) != digest or not os.path.exists(output_path)
+        if changed:
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+        
+        self.events.advance('generate', self.output_dir, 'files', 1, total)
+        
+        return rel_path, digest, changed
+    
     def _write_generated_code(self, generated_code):
-        main_file = os.path.join(self.output_dir, "main.dart")
-        with open(main_file, 'w', encoding='utf-8') as f:
-            f.write(generated_code['main_app'])
-            f.write("\n\n")
-            f.write(generated_code['widgets'])
-            f.write("\n\n")
-            f.write(generated_code['pages'])
-            f.write("\n\n")
-            f.write(generated_code['models'])
-        
-        summary_file = os.path.join(self.output_dir, "SUMMARY.md")
-        with open(summary_file, 'w', encoding='utf-8') as f:
-            f.write(generated_code['summary'])
+        previous_hashes = self._load_previous_hashes()
+        
+        total = len(generated_code['units'])
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            results = list(pool.map(lambda unit: self._write_unit(unit, previous_hashes, total),
+                                    generated_code['units']))
         
-        widgets_file = os.path.join(self.output_dir, "widgets.dart")
-        with open(widgets_file, 'w', encoding='utf-8') as f:
-            f.write(generated_code['widgets'])
+        current_hashes = {rel_path: digest for rel_path, digest, _ in results}
+        written = sum(1 for _, _, changed in results if changed)
         
-        print(f"⚪ Generated main.dart: {main_file}")
-        print(f"⚪ Generated summary: {summary_file}")
-        print(f"⚪ Generated widgets: {widgets_file}")
+        removed = 0
+        for rel_path in previous_hashes:
+            if rel_path in current_hashes:
+                continue
+            stale_path = os.path.join(self.output_dir, *rel_path.split('/'))
+            if os.path.exists(stale_path):
+                os.remove(stale_path)
+                removed += 1
+        
+        with open(self.hashes_file, 'w', encoding='utf-8') as f:
+            json.dump(current_hashes, f, indent=2, sort_keys=True)
+        
+        self.events.log(f"⚪ Generated files: {len(results)} ({written} written, "
+                        f"{len(results) - written} unchanged, {removed} removed)")
+        self.events.log(f"   🔵 Widgets: {len(generated_code['widgets'])}")
+        self.events.log(f"   🔵 Pages: {len(generated_code['pages'])}")
+        self.events.log(f"   🔵 Models: {len(generated_code['models'])}")
+        self.events.log(f"⚪ Generated package: {os.path.join(self.output_dir, 'lib')}")
+        
+        return {
+            'files': len(results),
+            'written': written,
+            'unchanged': len(results) - written,
+            'removed': removed
+        }
 
 def main():
     parser = argparse.ArgumentParser(description='Flutter Decompiler - Complete Tool')
     parser.add_argument('apk_path', help='Path to APK file')
-    parser.add_argument('--mode', choices=['extract', 'snapshot', 'symbols', 'widgets', 'reconstruct', 'generate', 'all'], 
+    parser.add_argument('--mode', choices=['fingerprint', 'extract', 'snapshot', 'symbols', 'widgets', 'reconstruct', 'generate', 'all'], 
                        default='all', help='Execution mode')
+    parser.add_argument('--streaming', action='store_true',
+                       help='Bounded-memory reconstruction (counts, top-K and samples only)')
+    parser.add_argument('--top-k', type=int, default=20,
+                       help='Longest fragments kept per category in streaming mode')
+    parser.add_argument('--sample-size', type=int, default=20,
+                       help='Reservoir sample size per category in streaming mode')
+    parser.add_argument('--spill', action='append', default=[],
+                       choices=SmartDartReconstructor.CATEGORIES + ['all'],
+                       help='Write the full list of a category to disk in streaming mode')
+    parser.add_argument('--obfuscation-map', action='append', default=[],
+                       help='Obfuscation map JSON (--save-obfuscation-map output or a *_symbols.json)')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Threads scanning native libraries while the APK is inflated')
+    parser.add_argument('--no-pipeline', action='store_true',
+                       help='Extract the whole APK first, then analyse libraries one at a time')
+    parser.add_argument('--events', metavar='TARGET',
+                       help="NDJSON progress events to '-' (stdout), 'fd:N' or a file path")
+    parser.add_argument('--events-interval', type=float, default=0.5,
+                       help='Minimum seconds between progress events of one stage')
+    parser.add_argument('--quiet', action='store_true',
+                       help='Suppress human-readable progress output')
+    parser.add_argument('--index', metavar='PATH',
+                       help='MinHash/LSH fingerprint index (SQLite) to add this app to and query')
+    parser.add_argument('--similar', type=int, default=5,
+                       help='Number of similar indexed apps to report')
+    parser.add_argument('--app-id', metavar='ID',
+                       help='Key for this app in --index (default: SHA-256 of the APK)')
+    parser.add_argument('--stage-time-limit', type=float, metavar='SECONDS',
+                       help='Time budget for each analysis stage')
+    parser.add_argument('--stage-memory-limit', type=float, metavar='MB',
+                       help='Process RSS budget while each analysis stage runs')
+    parser.add_argument('--budget', action='append', default=[], metavar='STAGE=SECONDS[:MB]',
+                       help='Per-stage override for snapshot, symbols or reconstruct, e.g. symbols=60:2048; '
+                            'an empty field keeps the global limit (reconstruct=:1024)')
     
     args = parser.parse_args()
     
+    events = ProgressEvents.from_target(args.events, quiet=args.quiet,
+                                        min_interval=args.events_interval)
+    
     if not os.path.exists(args.apk_path):
-        print(f"🔵 APK file not found!: {args.apk_path}")
+        events.log(f"🔵 APK file not found!: {args.apk_path}")
+        events.emit('error', message=f"APK file not found: {args.apk_path}")
         sys.exit(1)
     
+    stage_limits = {}
+    for spec in args.budget:
+        try:
+            stage, limits = spec.split('=', 1)
+            if stage not in ExecutionBudget.STAGES:
+                parser.error(f"unknown --budget stage '{stage}' "
+                             f"(choose from {', '.join(ExecutionBudget.STAGES)})")
+            seconds, _, megabytes = limits.partition(':')
+            stage_limits[stage] = (float(seconds) if seconds else None,
+                                   float(megabytes) if megabytes else None)
+        except ValueError:
+            parser.error(f"invalid --budget value: {spec}")
+    
+    budget = ExecutionBudget(args.stage_time_limit, args.stage_memory_limit, stage_limits,
+                             events=events)
+    
+    obfuscation_map = ObfuscationMap(events)
+    for map_path in args.obfuscation_map:
+        try:
+            obfuscation_map.load(map_path)
+        except (OSError, ValueError) as e:
+            events.log(f"🔵 Obfuscation map error: {e}")
+    
+    if args.mode == 'fingerprint':
+        fingerprinter = LibraryFingerprinter(events)
+        fingerprints = fingerprinter.fingerprint_apk(args.apk_path)
+        fingerprinter.print_report(fingerprints)
+        if events.verbose:
+            print(json.dumps(fingerprints, indent=2))
+        events.emit('fingerprints', libraries=fingerprints)
+        return
+    
+    def analyze_lib(lib_name, lib_path):
+        results = {}
+        
+        if args.mode in ['snapshot', 'all']:
+            events.log(f"\n{'='*60}")
+            events.log(f"🔵 SNAPSHOT EXTRACTION: {lib_name}")
+            events.log(f"{'='*60}")
+            snapshot_extractor = SnapshotExtractor(events=events, budget=budget)
+            snapshots = snapshot_extractor.extract_snapshot(lib_path)
+            if snapshots:
+                events.log(f"⚪ {len(snapshots)} snapshots extracted!")
+            results['snapshots'] = snapshots
+        
+        if args.mode in ['symbols', 'widgets', 'reconstruct', 'generate', 'all']:
+            events.log(f"\n{'='*60}")
+            events.log(f"🔵 SYMBOL RECOVERY: {lib_name}")
+            events.log(f"{'='*60}")
+            symbol_recovery = DartSymbolRecovery(obfuscation_map, events, budget)
+            findings = symbol_recovery.recover_symbols(lib_path, lib_name)
+            if findings:
+                events.log(f"⚪ Symbol recovery completed!")
+            results['symbols'] = findings
+        
+        return results
+    
     if args.mode in ['extract', 'snapshot', 'symbols', 'widgets', 'reconstruct', 'generate', 'all']:
-        extractor = FlutterExtractor()
-        libs = extractor.extract_apk(args.apk_path)
+        extractor = FlutterExtractor(workers=args.workers, events=events)
+        
+        if args.no_pipeline:
+            libs = extractor.extract_apk(args.apk_path)
+        else:
+            # Snapshot and symbol stages run on each Dart library as soon as it is inflated
+            libs = extractor.extract_apk_pipelined(args.apk_path,
+                                                   analyze_lib if args.mode != 'extract' else None)
         
         if not libs:
-            print("🔵 No libs found!")
+            events.log("🔵 No libs found!")
             return
+        
+        dart_app_libs = extractor.fingerprinter.select_dart_apps(extractor.fingerprints)
+        
+        if args.no_pipeline and args.mode != 'extract':
+            for lib_name in dart_app_libs:
+                extractor.analysis_results[lib_name] = analyze_lib(lib_name, libs[lib_name])
     
-    if args.mode in ['snapshot', 'all']:
-        for lib_name, lib_path in libs.items():
-            if 'libapp.so' in lib_name:
-                print(f"\n{'='*60}")
-                print(f"🔵 SNAPSHOT EXTRACTION: {lib_name}")
-                print(f"{'='*60}")
-                snapshot_extractor = SnapshotExtractor()
-                snapshots = snapshot_extractor.extract_snapshot(lib_path)
-                if snapshots:
-                    print(f"⚪ {len(snapshots)} snapshots extracted!")
-    
-    if args.mode in ['symbols', 'widgets', 'reconstruct', 'generate', 'all']:
-        for lib_name, lib_path in libs.items():
-            if 'libapp.so' in lib_name:
-                print(f"\n{'='*60}")
-                print(f"🔵 SYMBOL RECOVERY: {lib_name}")
-                print(f"{'='*60}")
-                symbol_recovery = DartSymbolRecovery()
-                findings = symbol_recovery.recover_symbols(lib_path)
-                if findings:
-                    print(f"⚪ Symbol recovery completed!")
+    if args.index and args.mode != 'extract' and dart_app_libs:
+        findings = extractor.analysis_results.get(dart_app_libs[0], {}).get('symbols')
+        if findings:
+            app_key = args.app_id or MinHashIndex.app_id(args.apk_path)
+            fingerprint_index = MinHashIndex(args.index, events=events)
+            fingerprint_index.report_similar(app_key, findings, limit=args.similar)
+            # Truncated or sampled findings would store a skewed signature for this app
+            budget_state = findings.get('budget', {}).get('state', 'ok')
+            if budget_state == 'ok':
+                fingerprint_index.index_findings(app_key, findings, path=os.path.abspath(args.apk_path))
+            else:
+                events.log(f"🔵 Not indexing {app_key}: symbols budget {budget_state}")
+                events.stage_end('index', app_key, skipped=f"symbols budget {budget_state}")
+            fingerprint_index.close()
     
     if args.mode in ['widgets', 'reconstruct', 'generate', 'all']:
         symbols_dir = "dart_symbols"
         if os.path.exists(symbols_dir):
             json_files = [f for f in os.listdir(symbols_dir) if f.endswith('_symbols.json')]
             if json_files:
-                widget_analyzer = WidgetTreeBuilder()
+                widget_analyzer = WidgetTreeBuilder(obfuscation_map, events)
                 for json_file in json_files:
                     json_path = os.path.join(symbols_dir, json_file)
-                    print(f"\n{'='*60}")
-                    print(f"🔵 WIDGET ANALYSIS: {json_file}")
-                    print(f"{'='*60}")
-                    categorized, tree = widget_analyzer.analyze_widgets(json_path)
-                    print(f"⚪ Widget analysis completed!")
+                    events.log(f"\n{'='*60}")
+                    events.log(f"🔵 WIDGET ANALYSIS: {json_file}")
+                    events.log(f"{'='*60}")
+                    try:
+                        categorized, tree = widget_analyzer.analyze_widgets(json_path)
+                    except Exception as e:
+                        events.log(f"🔵 Widget analysis failed: {e!r}")
+                        events.emit('error', stage='widgets', target=json_path, message=repr(e))
+                        continue
+                    events.log(f"⚪ Widget analysis completed!")
     
     if args.mode in ['reconstruct', 'generate', 'all']:
-        print(f"\n{'='*60}")
-        print(f"🔵 SMART RECONSTRUCTION")
-        print(f"{'='*60}")
-        reconstructor = SmartDartReconstructor()
-        reconstruction_results = reconstructor.reconstruct_dart_code()
+        events.log(f"\n{'='*60}")
+        events.log(f"🔵 SMART RECONSTRUCTION")
+        events.log(f"{'='*60}")
+        reconstructor = SmartDartReconstructor(streaming=args.streaming, top_k=args.top_k,
+                                               sample_size=args.sample_size,
+                                               spill_categories=args.spill,
+                                               obfuscation_map=obfuscation_map,
+                                               events=events, budget=budget)
+        libapp_path = libs[dart_app_libs[0]] if dart_app_libs else None
+        try:
+            reconstruction_results = reconstructor.reconstruct_dart_code(libapp_path)
+        except Exception as e:
+            # Includes MemoryError: a pathological binary must not take the worker down
+            events.log(f"🔵 Smart reconstruction failed: {e!r}")
+            events.emit('error', stage='reconstruct', message=repr(e))
+            reconstruction_results = None
         if reconstruction_results:
-            print(f"⚪ Smart reconstruction completed!")
+            events.log(f"⚪ Smart reconstruction completed!")
     
     if args.mode in ['generate', 'all']:
-        print(f"\n{'='*60}")
-        print(f"🔵 CODE GENERATION")
-        print(f"{'='*60}")
-        generator = DartCodeGenerator()
-        generation_results = generator.generate_dart_code()
+        events.log(f"\n{'='*60}")
+        events.log(f"🔵 CODE GENERATION")
+        events.log(f"{'='*60}")
+        generator = DartCodeGenerator(events=events)
+        try:
+            generation_results = generator.generate_dart_code()
+        except Exception as e:
+            events.log(f"🔵 Code generation failed: {e!r}")
+            events.emit('error', stage='generate', message=repr(e))
+            generation_results = None
         if generation_results:
-            print(f"⚪ CODE GENERATION COMPLETED!")
-    
-    print(f"\n⚪ All operations completed!")
-    print("👉 Check the generated folders:")
-    print("   - temp_extract/ (APK extraction)")
-    print("   - snapshots/ (Dart snapshots)")
-    print("   - dart_symbols/ (Symbol recovery)")
-    print("   - widget_analysis/ (Widget analysis)")
-    print("   - reconstructed_code/ (Code reconstruction)")
-    print("   - generated_code/ (Generated Dart code)")
+            events.log(f"⚪ CODE GENERATION COMPLETED!")
+    
+    events.emit('done', apk=args.apk_path, mode=args.mode)
+    events.log(f"\n⚪ All operations completed!")
+    events.log("👉 Check the generated folders:")
+    events.log("   - temp_extract/ (APK extraction)")
+    events.log("   - snapshots/ (Dart snapshots)")
+    events.log("   - dart_symbols/ (Symbol recovery)")
+    events.log("   - widget_analysis/ (Widget analysis)")
+    events.log("   - reconstructed_code/ (Code reconstruction)")
+    events.log("   - generated_code/ (Generated Dart code)")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file